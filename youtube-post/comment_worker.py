@@ -15,14 +15,35 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
 import random
 import re
+import sys
 import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
-import requests
 from youtube_auth import get_access_token
+from youtube_http import get_session
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+
+# -----------------------------
+# PATHS (resolved once at import)
+# -----------------------------
+BASE_DIR = Path(__file__).resolve().parent
+POST_STATE_PATH = BASE_DIR / "state" / "youtube_post_state.json"
+COMMENT_STATE_PATH = BASE_DIR / "state" / "youtube_comment_state.json"
+COMMENT_RUNS_PATH = BASE_DIR / "state" / "youtube_comment_state.runs.ndjson"  # append-only run log
+COMMENT_LOG_PATH = BASE_DIR / "state" / "youtube_comment_state.log.ndjson"  # item updates since last snapshot
+COMPACT_LOG_BYTES = 1024 * 1024  # fold the update log into the snapshot past this size
 
 
 # -----------------------------
@@ -33,9 +54,26 @@ MAX_COMMENT_ATTEMPTS = 2           # real POST attempts
 VERIFY_DELAY_SEC = 60 * 30         # 30 min after POST
 MAX_VERIFY_ATTEMPTS = 3
 SKIP_RETRY_SEC = 60 * 60            # 1 hour
+MAX_COMMENTS_PER_RUN = 1           # >1 sends all comments in one batch request
 
+# comment_status values (interned: compared on every run against state records)
+STATUS_COMMENTED = sys.intern("commented")
+STATUS_UNVERIFIED = sys.intern("commented_unverified")
+STATUS_SKIPPED = sys.intern("skipped")
+STATUS_FAILED = sys.intern("failed")
 
-TEMPLATES = [
+
+@dataclass(slots=True)
+class RunEvent:
+    # one line of the runs log; turned into a dict only when appended
+    ts: str
+    video_id: str
+    result: str
+    comment_id: str = ""
+    template_idx: int = -1
+
+
+TEMPLATES = (
     "Light pressure with {grit} grit usually blends faster than pushing hard—let the Silicon Carbide abrasive do the cutting. Are you sanding wood, metal, drywall, or paint today?",
     "If the scratch pattern looks uneven, do a few light crosshatch passes and re-check under side light. Are you sanding wet or dry on {surface}?",
     "Keep the sanding block flat so you don’t dig grooves at the edges—especially on corners and seams. Are you using a block, a pad, or hand-only?",
@@ -61,25 +99,107 @@ TEMPLATES = [
     "If you’re trying to level a bump, mark the area lightly with pencil and sand until the marks fade evenly—great for spotting highs and lows. Want the pencil-check method for {surface}?",
     "For auto body sanding on {surface}, keep overlaps consistent and use a clean wipe between grit changes—leftover grit can cause deeper scratches. Are you sanding primer, clear coat, or a blend panel?",
     "If you’re unsure which grit to grab next, match it to the goal: shape, level, smooth, or polish—each step should remove the last step’s scratches. What result do you want: faster removal or a finer finish?",
-]
+)
+
+
+# Templates without {placeholders} are used verbatim, skipping str.format
+TEMPLATE_HAS_FIELDS = tuple("{" in t for t in TEMPLATES)
+
+
+# Compiled once; extract_video_id runs for every post-state run scanned.
+# One alternation (shorts / watch?v= / youtu.be) so the URL is scanned a single time.
+VIDEO_ID_RE = re.compile(r"(?:/shorts/|[?&]v=|youtu\.be/)([A-Za-z0-9_-]{6,})")
+GRIT_RE = re.compile(r"(\d{2,4})\s*grit")
 
 
 # -----------------------------
 # HELPERS
 # -----------------------------
-def base_dir() -> Path:
-    return Path(__file__).resolve().parent
-
-
 def load_json(p: Path) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(p.read_bytes())
     return json.loads(p.read_text(encoding="utf-8"))
 
 
+def dump_json(data: Any, *, indent: bool = False) -> bytes:
+    # orjson output is byte-identical to json.dumps(..., ensure_ascii=False, indent=2)
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
 def save_json(p: Path, data: Dict[str, Any]) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     tmp = p.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-    tmp.replace(p)
+    with tmp.open("wb") as f:
+        f.write(dump_json(data, indent=True) + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, p)
+    fsync_dir(p.parent)
+
+
+def fsync_dir(d: Path) -> None:
+    # make the rename itself durable (POSIX only)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def append_ndjson(p: Path, events: List[Dict[str, Any]]) -> None:
+    if not events:
+        return
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open("ab") as f:
+        f.writelines(dump_json(e) + b"\n" for e in events)
+
+
+def load_comment_state(p: Path, log_p: Path) -> Dict[str, Any]:
+    # snapshot + replay of the item-update log (last record per video wins)
+    cstate = load_json(p) if p.exists() else {"version": 1, "items": {}}
+    if log_p.exists():
+        items = cstate.setdefault("items", {})
+        for line in log_p.read_bytes().splitlines():
+            try:
+                ev = orjson.loads(line) if orjson is not None else json.loads(line)
+            except ValueError:
+                continue  # torn final line from an interrupted append
+            if isinstance(ev, dict) and ev.get("video_id") and isinstance(ev.get("rec"), dict):
+                items[ev["video_id"]] = ev["rec"]
+    return cstate
+
+
+def save_comment_state(
+    p: Path,
+    log_p: Path,
+    cstate: Dict[str, Any],
+    changed: Dict[str, Dict[str, Any]],
+    *,
+    snapshot: bool = False,
+) -> None:
+    # O(1) path: append only the records touched this run
+    append_ndjson(log_p, [{"video_id": vid, "rec": rec} for vid, rec in changed.items()])
+
+    if snapshot or (log_p.exists() and log_p.stat().st_size > COMPACT_LOG_BYTES):
+        save_json(p, cstate)
+        # truncate (not delete) so the emptied log is committed alongside the snapshot
+        log_p.write_bytes(b"")
+
+
+def migrate_runs(cstate: Dict[str, Any], runs_p: Path) -> bool:
+    # legacy layout kept "runs" inside the JSON state; move them to the append-only log
+    runs = cstate.pop("runs", None)
+    if runs is None:
+        return False
+    if isinstance(runs, list):
+        append_ndjson(runs_p, [r for r in runs if isinstance(r, dict)])
+    return True
 
 
 def now() -> float:
@@ -87,46 +207,63 @@ def now() -> float:
 
 
 def now_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    # "...+00:00" -> "...Z" (same format as before, without a strftime parse)
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")[:-6] + "Z"
 
 
 def stable_rng(seed: str) -> random.Random:
-    h = hashlib.sha256(seed.encode()).hexdigest()
-    return random.Random(int(h[:8], 16))
+    # not security-sensitive: a small blake2b digest is plenty to seed the RNG
+    h = hashlib.blake2b(seed.encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(h, "big"))
+
+
+def intern_statuses(cstate: Dict[str, Any]) -> None:
+    # json.loads returns fresh strings; intern them so status checks hit the identity fast path
+    for rec in (cstate.get("items") or {}).values():
+        st = rec.get("comment_status") if isinstance(rec, dict) else None
+        if isinstance(st, str):
+            rec["comment_status"] = sys.intern(st)
 
 
 def extract_video_id(url: str) -> str:
     if not url:
         return ""
-    for rx in [
-        r"/shorts/([A-Za-z0-9_-]{6,})",
-        r"[?&]v=([A-Za-z0-9_-]{6,})",
-        r"youtu\.be/([A-Za-z0-9_-]{6,})",
-    ]:
-        m = re.search(rx, url)
-        if m:
-            return m.group(1)
-    return ""
+    m = VIDEO_ID_RE.search(url)
+    return m[1] if m else ""
 
 
 def surface_from_manifest(m: str) -> str:
-    return (m or "").replace(".json", "").lower() or "surface"
+    if not m:
+        return "surface"
+    s = m.removesuffix(".json")
+    # manifest names are normally lowercase already; skip the extra copy then
+    if not s.islower():
+        s = s.lower()
+    return s or "surface"
+
+
+def render_template(idx: int, *, grit: str, surface: str) -> str:
+    tpl = TEMPLATES[idx]
+    return tpl.format(grit=grit, surface=surface) if TEMPLATE_HAS_FIELDS[idx] else tpl
 
 
 def parse_grit(t: str) -> Optional[str]:
     if not t:
         return None
-    m = re.search(r"(\d{2,4})\s*grit", t.lower())
-    return m.group(1) if m else None
+    t = t.lower()
+    if "grit" not in t:
+        return None
+    m = GRIT_RE.search(t)
+    return m[1] if m else None
 
 
 # -----------------------------
 # YOUTUBE API
 # -----------------------------
 def post_comment(token: str, video_id: str, text: str) -> str:
-    r = requests.post(
+    r = get_session().post(
         "https://www.googleapis.com/youtube/v3/commentThreads",
-        params={"part": "snippet"},
+        params={"part": "snippet", "fields": "id"},
         headers={"Authorization": f"Bearer {token}"},
         json={"snippet": {"videoId": video_id, "topLevelComment": {"snippet": {"textOriginal": text}}}},
         timeout=60,
@@ -135,23 +272,131 @@ def post_comment(token: str, video_id: str, text: str) -> str:
     return str(r.json().get("id") or "unknown")
 
 
-def comment_exists(token: str, cid: str) -> bool:
-    r = requests.get(
+BATCH_URL = "https://www.googleapis.com/batch/youtube/v3"
+MAX_BATCH_SIZE = 50
+BATCH_PART_ID_RE = re.compile(r"^content-id:\s*<response-item(\d+)>", re.I | re.M)
+BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?')
+
+
+def post_comments_batch(token: str, pairs: List[Tuple[str, str]]) -> List[Union[str, Exception]]:
+    """Insert several top-level comments with one multipart/mixed request.
+
+    Returns one entry per (video_id, text) pair: the new comment id, or the
+    exception describing why that sub-request failed.
+    """
+    out: List[Union[str, Exception]] = []
+    for start in range(0, len(pairs), MAX_BATCH_SIZE):
+        chunk = pairs[start:start + MAX_BATCH_SIZE]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for i, (video_id, text) in enumerate(chunk):
+            body = dump_json({"snippet": {"videoId": video_id, "topLevelComment": {"snippet": {"textOriginal": text}}}})
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <item{i}>\r\n\r\n"
+                "POST /youtube/v3/commentThreads?part=snippet&fields=id HTTP/1.1\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{body.decode('utf-8')}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+
+        r = get_session().post(
+            BATCH_URL,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": f"multipart/mixed; boundary={boundary}",
+            },
+            data="".join(parts).encode("utf-8"),
+            timeout=60,
+        )
+        r.raise_for_status()
+        out.extend(parse_batch_response(r.headers.get("Content-Type", ""), r.text, len(chunk)))
+    return out
+
+
+def parse_batch_response(content_type: str, text: str, n: int) -> List[Union[str, Exception]]:
+    m = BOUNDARY_RE.search(content_type)
+    if not m:
+        raise RuntimeError(f"Batch response is not multipart: {content_type!r}")
+
+    out: List[Union[str, Exception]] = [RuntimeError("No batch response part")] * n
+    for part in text.replace("\r\n", "\n").split(f"--{m[1]}"):
+        outer, _, inner = part.partition("\n\n")
+        pm = BATCH_PART_ID_RE.search(outer)
+        if not pm or int(pm[1]) >= n:
+            continue
+        status_line, _, rest = inner.strip().partition("\n")
+        body = rest.partition("\n\n")[2].strip()
+        try:
+            code = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            out[int(pm[1])] = RuntimeError(f"Malformed batch part: {status_line!r}")
+            continue
+        if 200 <= code < 300:
+            # one unreadable part must not fail the whole batch (its siblings were posted)
+            try:
+                data = json.loads(body)
+            except ValueError as e:
+                out[int(pm[1])] = RuntimeError(f"Unreadable batch part body: {e}: {body[:300]}")
+                continue
+            out[int(pm[1])] = str((data.get("id") if isinstance(data, dict) else None) or "unknown")
+        else:
+            out[int(pm[1])] = RuntimeError(f"{status_line.strip()}: {body[:300]}")
+    return out
+
+
+def post_comments(token: str, pairs: List[Tuple[str, str]]) -> List[Union[str, Exception]]:
+    # A single comment keeps using the plain endpoint; several go out as one batch
+    if len(pairs) > 1:
+        return post_comments_batch(token, pairs)
+    out: List[Union[str, Exception]] = []
+    for video_id, text in pairs:
+        try:
+            out.append(post_comment(token, video_id, text))
+        except Exception as e:
+            out.append(e)
+    return out
+
+
+def existing_comment_ids(token: str, cids: List[str]) -> Set[str]:
+    # commentThreads.list takes a comma-separated id list -> one round trip verifies them all
+    found: Set[str] = set()
+    for i in range(0, len(cids), MAX_BATCH_SIZE):
+        found |= _list_comment_ids(token, cids[i:i + MAX_BATCH_SIZE])
+    return found
+
+
+def _list_comment_ids(token: str, cids: List[str]) -> Set[str]:
+    r = get_session().get(
         "https://www.googleapis.com/youtube/v3/commentThreads",
-        params={"part": "id", "id": cid},
+        params={"part": "id", "id": ",".join(cids), "fields": "items(id)"},
         headers={"Authorization": f"Bearer {token}"},
         timeout=30,
     )
     if r.status_code == 404:
-        return False
+        # one missing id 404s the whole call: bisect until the missing ids are isolated
+        if len(cids) == 1:
+            return set()
+        mid = len(cids) // 2
+        return _list_comment_ids(token, cids[:mid]) | _list_comment_ids(token, cids[mid:])
     r.raise_for_status()
-    return bool(r.json().get("items"))
+    return {it.get("id") for it in r.json().get("items") or []}
 
 
 # -----------------------------
 # CORE LOGIC
 # -----------------------------
 def iter_success_runs(post_state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # newest upload first via the post worker's index; runs walk covers the rest / older states
+    latest = post_state.get("latest_success")
+    if isinstance(latest, dict):
+        vid = latest.get("video_id") or extract_video_id(latest.get("video_url", ""))
+        if latest.get("result") == "success" and vid:
+            rr = dict(latest)
+            rr["youtube_video_id"] = vid
+            yield rr
+
     runs = post_state.get("runs") or []
     if isinstance(runs, list):
         for r in reversed(runs):
@@ -162,130 +407,198 @@ def iter_success_runs(post_state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
                 yield rr
 
 
-def pick_video(post_state: Dict[str, Any], cstate: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+def is_due(rec: Dict[str, Any], t: float) -> bool:
+    st = rec.get("comment_status")
+
+    # DONE forever
+    if st == STATUS_COMMENTED:
+        return False
+
+    # unverified -> check if time to verify
+    if st == STATUS_UNVERIFIED:
+        return t >= rec.get("verify_after_ts", 0)
+
+    # skipped / failed -> retry after cooldown
+    if st in (STATUS_SKIPPED, STATUS_FAILED):
+        return t >= rec.get("retry_after_ts", 0)
+
+    # new video (or a failed verify cleared for repost)
+    return True
+
+
+def iter_eligible(post_state: Dict[str, Any], cstate: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
     items = cstate.setdefault("items", {})
+    t = now()
+    seen = set()
 
     for run in iter_success_runs(post_state):
         vid = run["youtube_video_id"]
+        if vid in seen:
+            continue
+        seen.add(vid)
         rec = items.get(vid, {})
-        st = rec.get("comment_status")
-
-        # DONE forever
-        if st == "commented":
+        if is_due(rec, t):
+            yield run, rec
+
+    # The post state keeps only its last MAX_RUNS_KEPT runs; pending records whose
+    # run has rotated out are still ours to verify / retry.
+    manifests: Optional[Dict[str, Any]] = None
+    for vid, rec in list(items.items()):
+        if vid in seen or not isinstance(rec, dict) or not is_due(rec, t):
             continue
+        manifest = rec.get("manifest")
+        if not manifest:
+            if manifests is None:
+                # legacy post records keep the id under youtube_video_id
+                manifests = {}
+                for r in (post_state.get("items") or {}).values():
+                    pid = (r.get("video_id") or r.get("youtube_video_id")) if isinstance(r, dict) else None
+                    if pid:
+                        manifests[str(pid)] = r.get("manifest")
+            manifest = manifests.get(vid)
+        yield {"youtube_video_id": vid, "manifest": manifest}, rec
 
-        # unverified -> check if time to verify
-        if st == "commented_unverified":
-            if now() < rec.get("verify_after_ts", 0):
-                continue
-            return run, rec
-
-        # skipped / failed -> retry after cooldown
-        if st in {"skipped", "failed"}:
-            if now() < rec.get("retry_after_ts", 0):
-                continue
-            return run, rec
-
-        # new video
-        return run, rec
 
-    return None
+def pick_video(post_state: Dict[str, Any], cstate: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    return next(iter_eligible(post_state, cstate), None)
 
 
 # -----------------------------
 # MAIN
 # -----------------------------
 def main() -> int:
-    base = base_dir()
-    post_p = base / "state" / "youtube_post_state.json"
-    comm_p = base / "state" / "youtube_comment_state.json"
+    post_p = POST_STATE_PATH
+    comm_p = COMMENT_STATE_PATH
+    runs_p = COMMENT_RUNS_PATH
+    log_p = COMMENT_LOG_PATH
 
     if not post_p.exists():
         print("No post state.")
         return 0
 
     post_state = load_json(post_p)
-    cstate = load_json(comm_p) if comm_p.exists() else {"version": 1, "items": {}, "runs": []}
+    cstate = load_comment_state(comm_p, log_p)
+    intern_statuses(cstate)
+    # layout change or no snapshot yet -> (re)write the snapshot
+    dirty = migrate_runs(cstate, runs_p) or not comm_p.exists()
+    changed: Dict[str, Dict[str, Any]] = {}
 
-    token = get_access_token()
-    picked = pick_video(post_state, cstate)
+    try:
+        picked = pick_video(post_state, cstate)
 
-    if not picked:
-        print("No eligible video.")
-        return 0
+        if not picked:
+            print("No eligible video.")
+            return 0
 
-    run, rec = picked
-    vid = run["youtube_video_id"]
-    items = cstate["items"]
+        token = get_access_token()
 
-    # ---------------- verify path
-    if rec.get("comment_status") == "commented_unverified":
-        cid = rec.get("comment_id")
-        tries = int(rec.get("verify_attempts", 0)) + 1
+        run, rec = picked
+        vid = run["youtube_video_id"]
+        items = cstate["items"]
+
+        # ---------------- verify path (every due unverified comment in one list call)
+        if rec.get("comment_status") == STATUS_UNVERIFIED:
+            due = [
+                (r["youtube_video_id"], rc)
+                for r, rc in iter_eligible(post_state, cstate)
+                if rc.get("comment_status") == STATUS_UNVERIFIED
+            ]
+            cids = [rc["comment_id"] for _, rc in due if rc.get("comment_id")]
+            found = existing_comment_ids(token, cids) if cids else set()
+
+            for vid, rec in due:
+                cid = rec.get("comment_id")
+                tries = int(rec.get("verify_attempts", 0)) + 1
+
+                if cid and cid in found:
+                    rec["comment_status"] = STATUS_COMMENTED
+                    rec["comment_verified_ts"] = now_iso()
+                    print(f"VERIFIED: comment exists for {vid}")
+                else:
+                    if tries >= MAX_VERIFY_ATTEMPTS:
+                        rec.pop("comment_status", None)  # allow repost
+                        rec.pop("comment_id", None)
+                        print(f"VERIFY FAILED: will repost later {vid}")
+                    else:
+                        rec["verify_attempts"] = tries
+                        rec["verify_after_ts"] = now() + VERIFY_DELAY_SEC
+                        print(f"VERIFY RETRY scheduled for {vid}")
+
+                items[vid] = rec
+                changed[vid] = rec
+            return 0
+
+        # ---------------- decide comment or skip (up to MAX_COMMENTS_PER_RUN videos)
+        jobs: List[Tuple[str, Dict[str, Any], int, str]] = []
+        decided = 0
+        for run, rec in iter_eligible(post_state, cstate):
+            if decided >= MAX_COMMENTS_PER_RUN:
+                break
+            if rec.get("comment_status") == STATUS_UNVERIFIED:
+                continue  # verified on a later run
+            decided += 1
+            vid = run["youtube_video_id"]
+
+            # (time-seeded so a retry after cooldown re-rolls; no RNG at all when always commenting)
+            if COMMENT_PROBABILITY < 1.0 and stable_rng(f"{vid}:{now()}").random() >= COMMENT_PROBABILITY:
+                rec.update({
+                    "comment_status": STATUS_SKIPPED,
+                    "retry_after_ts": now() + SKIP_RETRY_SEC,
+                    "comment_skipped_ts": now_iso(),
+                })
+                items[vid] = rec
+                changed[vid] = rec
+                print(f"SKIPPED: {vid}")
+                continue
 
-        if cid and comment_exists(token, cid):
-            rec["comment_status"] = "commented"
-            rec["comment_verified_ts"] = now_iso()
-            print(f"VERIFIED: comment exists for {vid}")
-        else:
-            if tries >= MAX_VERIFY_ATTEMPTS:
-                rec.pop("comment_status", None)  # allow repost
-                rec.pop("comment_id", None)
-                print(f"VERIFY FAILED: will repost later {vid}")
+            # template choice is planned once per video and stored, so later runs need no RNG
+            plan = rec.get("comment_plan")
+            idx = plan.get("template_idx") if isinstance(plan, dict) else None
+            # a malformed stored plan (null / non-int / out of range) is replanned, never raised on
+            if not isinstance(idx, int) or isinstance(idx, bool) or not 0 <= idx < len(TEMPLATES):
+                idx = stable_rng(vid).randrange(len(TEMPLATES))
+                rec["comment_plan"] = {"template_idx": idx}
+            text = render_template(idx, grit="this", surface=surface_from_manifest(run.get("manifest")))
+            jobs.append((vid, rec, idx, text))
+
+        if not jobs:
+            return 0
+
+        # ---------------- POST comments
+        try:
+            results = post_comments(token, [(vid, text) for vid, _, _, text in jobs])
+        except Exception as e:
+            results = [e] * len(jobs)
+
+        events: List[RunEvent] = []
+        for (vid, rec, idx, text), res in zip(jobs, results):
+            if isinstance(res, Exception):
+                rec.update({
+                    "comment_status": STATUS_FAILED,
+                    "retry_after_ts": now() + SKIP_RETRY_SEC,
+                    "error": str(res),
+                })
+                print(f"FAILED: {vid} {res}")
             else:
-                rec["verify_attempts"] = tries
-                rec["verify_after_ts"] = now() + VERIFY_DELAY_SEC
-                print(f"VERIFY RETRY scheduled for {vid}")
-
-        items[vid] = rec
-        save_json(comm_p, cstate)
-        return 0
-
-    # ---------------- decide comment or skip
-    rng = stable_rng(f"{vid}:{now()}")
-    if COMMENT_PROBABILITY < 1.0 and rng.random() >= COMMENT_PROBABILITY:
-        rec.update({
-            "comment_status": "skipped",
-            "retry_after_ts": now() + SKIP_RETRY_SEC,
-            "comment_skipped_ts": now_iso(),
-        })
-        items[vid] = rec
-        save_json(comm_p, cstate)
-        print(f"SKIPPED: {vid}")
+                rec.update({
+                    "comment_status": STATUS_UNVERIFIED,
+                    "comment_id": res,
+                    "comment_text": text,
+                    "comment_attempts": rec.get("comment_attempts", 0) + 1,
+                    "commented_ts": now_iso(),
+                    "verify_after_ts": now() + VERIFY_DELAY_SEC,
+                })
+                events.append(RunEvent(now_iso(), vid, STATUS_UNVERIFIED, res, idx))
+                print(f"POSTED: comment for {vid}")
+            items[vid] = rec
+            changed[vid] = rec
+
+        append_ndjson(runs_p, [asdict(ev) for ev in events])
         return 0
-
-    # ---------------- POST comment
-    text = TEMPLATES[stable_rng(vid).randrange(len(TEMPLATES))]
-    text = text.format(grit="this", surface=surface_from_manifest(run.get("manifest")))
-
-    try:
-        cid = post_comment(token, vid, text)
-        rec.update({
-            "comment_status": "commented_unverified",
-            "comment_id": cid,
-            "comment_text": text,
-            "comment_attempts": rec.get("comment_attempts", 0) + 1,
-            "commented_ts": now_iso(),
-            "verify_after_ts": now() + VERIFY_DELAY_SEC,
-        })
-        cstate.setdefault("runs", []).append({
-            "ts": now_iso(),
-            "video_id": vid,
-            "result": "commented_unverified",
-            "comment_id": cid,
-        })
-        print(f"POSTED: comment for {vid}")
-    except Exception as e:
-        rec.update({
-            "comment_status": "failed",
-            "retry_after_ts": now() + SKIP_RETRY_SEC,
-            "error": str(e),
-        })
-        print(f"FAILED: {vid} {e}")
-
-    items[vid] = rec
-    save_json(comm_p, cstate)
-    return 0
+    finally:
+        # single state write per invocation
+        if changed or dirty:
+            save_comment_state(comm_p, log_p, cstate, changed, snapshot=dirty)
 
 
 if __name__ == "__main__":
@@ -9,10 +9,16 @@
 from __future__ import annotations
 
 import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Iterator, List, Optional
 
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
 
 @dataclass(frozen=True)
 class ManifestItem:
@@ -27,6 +33,8 @@ class ManifestItem:
 
 
 def _load_json(path: Path) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
     return json.loads(path.read_text(encoding="utf-8"))
 
 
@@ -104,10 +112,17 @@ def iter_manifest_items(manifest_path: Path) -> Iterator[ManifestItem]:
 
 
 def read_all(manifest_dir: Path, *, order: Optional[List[str]] = None) -> List[ManifestItem]:
+    # one directory read instead of a stat per name
+    try:
+        with os.scandir(manifest_dir) as it:
+            present = {e.name for e in it if e.is_file()}
+    except FileNotFoundError:
+        present = set()
+
     if order:
-        paths = [manifest_dir / n for n in order if (manifest_dir / n).exists()]
+        paths = [manifest_dir / n for n in order if n in present]
     else:
-        paths = sorted(manifest_dir.glob("*.json"))
+        paths = [manifest_dir / n for n in sorted(present) if n.endswith(".json")]
 
     out: List[ManifestItem] = []
     for p in paths:
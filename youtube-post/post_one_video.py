@@ -9,43 +9,101 @@
 
 from __future__ import annotations
 
+import argparse
+import gzip
+import hashlib
 import json
 import os
+import queue
 import re
+import shutil
 import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-
-import requests
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
 from youtube_auth import get_access_token
+from youtube_http import get_session
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
 
 
 # ---------- Paths (repo-relative) ----------
 REPO_ROOT = Path(__file__).resolve().parents[1]
 MANIFEST_DIR = REPO_ROOT / "youtube-post" / "manifests"
 STATE_PATH = REPO_ROOT / "youtube-post" / "state" / "youtube_post_state.json"
+# runs evicted from the state ring buffer, one JSON line each (append-only gzip members)
+RUNS_ARCHIVE_PATH = REPO_ROOT / "youtube-post" / "state" / "youtube_post_runs.jsonl.gz"
+# Indented state keeps the committed file diffable; YOUTUBE_STATE_PRETTY=0 writes compact JSON
+STATE_PRETTY = (os.getenv("YOUTUBE_STATE_PRETTY") or "1").strip().lower() not in ("0", "false", "no")
 
 # Daily manifest rotation order (starting point rotates each day)
 MANIFEST_FILES_ORDER = ["drywall.json", "wood.json", "wet.json", "metal.json", "plastic.json"]
+# Scan order for each possible rotation start index (built once at import)
+_PRECOMPUTED_CYCLES: Tuple[Tuple[str, ...], ...] = tuple(
+    tuple(MANIFEST_FILES_ORDER[i:] + MANIFEST_FILES_ORDER[:i]) for i in range(len(MANIFEST_FILES_ORDER))
+)
 
 # ---------- Limits ----------
 TITLE_MAX = 100
 DESC_MAX = 5000  # YouTube allows much more; keep it readable
 MAX_ATTEMPTS_PER_VIDEO = 3
 DOWNLOAD_TIMEOUT = 600  # seconds
+UPLOAD_CHUNK = 8 * 1024 * 1024  # resumable upload chunk; must be a multiple of 256 KiB
+UPLOAD_RETRIES = 5  # consecutive 5xx / network failures tolerated per chunk
+UPLOAD_BACKOFF_SEC = 1.0  # first retry delay; doubles each consecutive failure
+UPLOAD_BACKOFF_MAX_SEC = 60.0
+PREFETCH_CHUNKS = 4  # download pieces buffered ahead of the upload (bounds memory)
+MAX_VIDEOS_PER_RUN = 1  # default for --batch; >1 uploads that many videos concurrently
+UPLOAD_WORKERS = 2  # cap on concurrent uploads in batch mode (they share one uplink)
+MAX_RUNS_KEPT = 100  # state["runs"] is a ring buffer; comment_worker only needs recent successes
 
 # Defaults for video metadata
 DEFAULT_PRIVACY_STATUS = "public"  # public | unlisted | private
 DEFAULT_CATEGORY_ID = "26"  # 26 = Howto & Style
 DEFAULT_MADE_FOR_KIDS = False
+PRIVACY_STATUSES = ("public", "unlisted", "private")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = (os.getenv(name) or "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes")
 
 
 @dataclass(frozen=True)
-class VideoItem:
+class Config:
+    """Run settings from the environment (see README "Optional env"), parsed once per run."""
+
+    privacy: str = DEFAULT_PRIVACY_STATUS
+    category_id: str = DEFAULT_CATEGORY_ID
+    made_for_kids: bool = DEFAULT_MADE_FOR_KIDS
+    tags: Tuple[str, ...] = ()
+    dry_run: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        privacy = (os.getenv("YOUTUBE_PRIVACY_STATUS") or DEFAULT_PRIVACY_STATUS).strip().lower()
+        if privacy not in PRIVACY_STATUSES:
+            raise ValueError(f"YOUTUBE_PRIVACY_STATUS must be one of {', '.join(PRIVACY_STATUSES)}: {privacy!r}")
+        return cls(
+            privacy=privacy,
+            category_id=(os.getenv("YOUTUBE_CATEGORY_ID") or DEFAULT_CATEGORY_ID).strip(),
+            made_for_kids=_env_bool("YOUTUBE_MADE_FOR_KIDS", DEFAULT_MADE_FOR_KIDS),
+            tags=tuple(t.strip() for t in (os.getenv("YOUTUBE_TAGS") or "").split(",") if t.strip()),
+            dry_run=_env_bool("YOUTUBE_POST_DRY_RUN", False),
+        )
+
+
+class VideoItem(NamedTuple):
     manifest_name: str
     manifest_action: str
     manifest_tag: str
@@ -60,18 +118,55 @@ class VideoItem:
 
 # ----------------- JSON helpers -----------------
 def load_json(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _loads(path.read_bytes())
+
 
+def _loads(raw: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
 
-def save_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+
+def dump_json(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        # same bytes as json.dumps(..., ensure_ascii=False, indent=2 / compact separators)
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if STATE_PRETTY else 0)
+    if STATE_PRETTY:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dump_line(data: Any) -> bytes:
+    # compact single-line JSON for append-only logs
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def write_bytes_atomic(path: Path, payload: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(path)
+    with tmp.open("wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(d: Path) -> None:
+    # make the rename itself durable (POSIX only)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 def utc_day_str() -> str:
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return datetime.now(timezone.utc).date().isoformat()
 
 
 # ----------------- Manifest parsing -----------------
@@ -133,25 +228,39 @@ def read_manifest_file(path: Path) -> List[VideoItem]:
     return out
 
 
-def read_all_items() -> List[VideoItem]:
-    paths: List[Path] = []
-    for name in MANIFEST_FILES_ORDER:
-        p = MANIFEST_DIR / name
-        if p.exists():
-            paths.append(p)
+def manifest_digest(path: Path) -> str:
+    # content hash, not mtime: every CI checkout rewrites mtimes
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
 
+def read_all_items(exhausted: Optional[Dict[str, str]] = None) -> List[VideoItem]:
+    """All manifest items, skipping manifests listed in `exhausted` ({name: digest}) whose content is unchanged."""
+    # One directory read instead of a stat per ordered name plus a glob
+    try:
+        with os.scandir(MANIFEST_DIR) as it:
+            present = {e.name for e in it if e.name.endswith(".json") and e.is_file()}
+    except FileNotFoundError:
+        present = set()
+
+    names = [n for n in MANIFEST_FILES_ORDER if n in present]
     # Include any extra manifests not in the order list
-    extra = sorted([p for p in MANIFEST_DIR.glob("*.json") if p.name not in set(MANIFEST_FILES_ORDER)])
-    paths.extend(extra)
+    names.extend(sorted(present.difference(MANIFEST_FILES_ORDER)))
+    paths = [MANIFEST_DIR / n for n in names]
 
     out: List[VideoItem] = []
     for p in paths:
+        if exhausted and exhausted.get(p.name) == manifest_digest(p):
+            continue
         out.extend(read_manifest_file(p))
     return out
 
 
 # ----------------- SEO formatting -----------------
 def _truncate(text: str, limit: int) -> str:
+    # fast path: already short and trimmed (the common case for titles/summaries)
+    n = len(text) if text else 0
+    if n <= limit and (n == 0 or not (text[0].isspace() or text[-1].isspace())):
+        return text or ""
     text = (text or "").strip()
     if len(text) <= limit:
         return text
@@ -200,9 +309,11 @@ def build_description(item: VideoItem) -> str:
         "sanding",
     ]
     hashtags: List[str] = []
+    seen: Set[str] = set()
     for t in tags_raw:
         h = _hashtagify(t)
-        if h and h not in hashtags:
+        if h and h not in seen:
+            seen.add(h)
             hashtags.append(h)
         if len(hashtags) >= 3:
             break
@@ -233,44 +344,144 @@ def build_description(item: VideoItem) -> str:
     return _truncate(desc, DESC_MAX)
 
 
-def build_tags(item: VideoItem) -> List[str]:
+def build_tags(item: VideoItem, extra: Iterable[str] = ()) -> List[str]:
     # YouTube "tags" are optional. Keep short and relevant.
-    base = []
-    for t in [item.manifest_tag, item.manifest_action, "sanding", "sandpaper"]:
+    base: List[str] = []
+    seen: Set[str] = set()
+    for t in (item.manifest_tag, item.manifest_action, "sanding", "sandpaper", *extra):
         t = (t or "").strip()
-        if not t:
-            continue
-        if t.lower() not in [x.lower() for x in base]:
+        lo = t.lower()
+        if t and lo not in seen:
+            seen.add(lo)
             base.append(t)
-    return base[:8]
+            if len(base) >= 8:
+                break
+    return base
 
 
 # ----------------- State / rotation -----------------
 def load_or_init_state() -> Dict[str, Any]:
     if STATE_PATH.exists():
         return load_json(STATE_PATH)
+    return _new_state()
+
+
+def _new_state() -> Dict[str, Any]:
     return {
         "version": 1,
         "rotation": {"manifest_index": -1, "last_day": ""},
-        "items": {},  # keyed by video_url
+        "items": {},  # keyed by item_key(video_url)
         "runs": [],
     }
 
 
-def should_skip_item(state: Dict[str, Any], item: VideoItem) -> bool:
-    items = state.get("items") or {}
-    rec = items.get(item.video_url)
-    if not isinstance(rec, dict):
+def item_key(video_url: str) -> str:
+    # short fixed-size key instead of the full release URL (URL is kept inside the record)
+    return hashlib.blake2b(video_url.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Manifest copies that older versions stored per item; the manifest stays the source of truth
+_DROPPED_ITEM_FIELDS = ("title", "description", "destination_url")
+
+
+def migrate_state(state: Dict[str, Any]) -> None:
+    """Re-key URL-keyed items and drop copied manifest text (runs are trimmed by StateWriter)."""
+    items = state.get("items")
+    if isinstance(items, dict) and any(k.startswith("http") for k in items):
+        migrated: Dict[str, Any] = {}
+        for k, rec in items.items():
+            if not isinstance(rec, dict):
+                continue
+            url = str(rec.get("video_url") or k)
+            rec["video_url"] = url
+            for f in _DROPPED_ITEM_FIELDS:
+                rec.pop(f, None)
+            migrated.setdefault(item_key(url), rec)
+        state["items"] = migrated
+
+
+def trim_runs(runs: List[Any]) -> List[Any]:
+    """Cut runs to the newest MAX_RUNS_KEPT in place; returns the evicted ones, oldest first."""
+    evicted = runs[:-MAX_RUNS_KEPT]
+    del runs[:-MAX_RUNS_KEPT]
+    return evicted
+
+
+def archive_runs(entries: List[Any]) -> None:
+    # gzip members concatenate into one valid stream, so appending never rewrites history
+    RUNS_ARCHIVE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    lines = b"".join(dump_line(e) for e in entries)
+    with RUNS_ARCHIVE_PATH.open("ab") as f:
+        f.write(gzip.compress(lines, compresslevel=9, mtime=0))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class StateWriter:
+    """Loads the post state for one run and writes it back once on exit.
+
+    The write happens even if the run raises (recorded attempts must survive),
+    and is skipped when the serialized state equals the bytes that were loaded.
+    Runs beyond MAX_RUNS_KEPT are trimmed here and appended to the archive only
+    after the state without them is on disk, so a failed write loses no runs.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.state: Dict[str, Any] = {}
+        self._loaded = b""
+
+    def __enter__(self) -> Dict[str, Any]:
+        if self.path.exists():
+            self._loaded = self.path.read_bytes()
+            self.state = _loads(self._loaded)
+        else:
+            self.state = _new_state()
+        return self.state
+
+    def __exit__(self, *exc: Any) -> None:
+        runs = self.state.get("runs")
+        evicted = trim_runs(runs) if isinstance(runs, list) else []
+        payload = dump_json(self.state)
+        if payload != self._loaded:
+            write_bytes_atomic(self.path, payload)
+        if evicted:
+            archive_runs(evicted)
+
+
+def skipped_urls(state: Dict[str, Any]) -> Set[str]:
+    """URLs the picker must pass over (posted, source gone or out of attempts), built once per scan."""
+    done: Set[str] = set()
+    for rec in (state.get("items") or {}).values():
+        if not isinstance(rec, dict):
+            continue
+        if rec.get("result") in ("success", "unavailable") or int(rec.get("attempts") or 0) >= MAX_ATTEMPTS_PER_VIDEO:
+            done.add(str(rec.get("video_url") or ""))
+    return done
+
+
+def is_postable(item: VideoItem) -> bool:
+    if item.status and item.status.lower() != "ready":
         return False
-    # success already posted
-    if rec.get("result") == "success":
-        return True
-    # too many attempts
-    attempts = int(rec.get("attempts") or 0)
-    return attempts >= MAX_ATTEMPTS_PER_VIDEO
+    return bool(item.video_url and item.title)
+
+
+def update_exhausted_manifests(state: Dict[str, Any], all_items: List[VideoItem]) -> None:
+    """Record (by content hash) parsed manifests with nothing left to post."""
+    scan = state.setdefault("manifest_scan", {})
+    by_manifest: Dict[str, List[VideoItem]] = {}
+    for it in all_items:
+        by_manifest.setdefault(it.manifest_name, []).append(it)
 
+    skip = skipped_urls(state)
+    for name, its in by_manifest.items():
+        if all(not is_postable(it) or it.video_url in skip for it in its):
+            scan[name] = manifest_digest(MANIFEST_DIR / name)
+        else:
+            scan.pop(name, None)
 
-def pick_next_item(state: Dict[str, Any], all_items: List[VideoItem]) -> Optional[VideoItem]:
+
+def pick_next_items(state: Dict[str, Any], all_items: List[VideoItem], limit: int) -> List[VideoItem]:
     # Rotate starting manifest index once per day
     rotation = state.get("rotation") or {}
     last_day = str(rotation.get("last_day") or "")
@@ -284,48 +495,139 @@ def pick_next_item(state: Dict[str, Any], all_items: List[VideoItem]) -> Optiona
         state["rotation"] = rotation
 
     # Build an ordered manifest list starting from idx
-    ordered_manifests = []
-    for i in range(len(MANIFEST_FILES_ORDER)):
-        ordered_manifests.append(MANIFEST_FILES_ORDER[(idx + i) % len(MANIFEST_FILES_ORDER)])
+    ordered_manifests = _PRECOMPUTED_CYCLES[idx % len(_PRECOMPUTED_CYCLES)]
 
-    # Scan manifests in that order; take first READY item that isn't posted yet
+    # Scan manifests in that order; take the first READY items that aren't posted yet
     by_manifest: Dict[str, List[VideoItem]] = {}
     for it in all_items:
         by_manifest.setdefault(it.manifest_name, []).append(it)
 
-    for m in ordered_manifests:
-        for it in by_manifest.get(m, []):
-            if it.status and it.status.lower() != "ready":
-                continue
-            if not it.video_url or not it.title:
-                continue
-            if should_skip_item(state, it):
-                continue
-            return it
-
-    # Fallback: scan everything
-    for it in all_items:
-        if it.status and it.status.lower() != "ready":
-            continue
-        if not it.video_url or not it.title:
-            continue
-        if should_skip_item(state, it):
+    def candidates() -> Iterator[VideoItem]:
+        for m in ordered_manifests:
+            yield from by_manifest.get(m, [])
+        # Fallback: scan everything
+        yield from all_items
+
+    picked: List[VideoItem] = []
+    # posted / maxed-out URLs, plus the ones picked so far (one set lookup per candidate)
+    skip = skipped_urls(state)
+    for it in candidates():
+        if len(picked) >= limit:
+            break
+        if it.video_url in skip or not is_postable(it):
             continue
-        return it
+        picked.append(it)
+        skip.add(it.video_url)
 
-    return None
+    return picked
 
 
 # ----------------- Download + Upload -----------------
 def download_video(video_url: str, out_path: Path) -> None:
-    with requests.get(video_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+    """Download to `out_path`, resuming a partial file left by an earlier attempt with a Range request."""
+    existing = out_path.stat().st_size if out_path.exists() else 0
+    headers = {"Range": f"bytes={existing}-", "Accept-Encoding": "identity"} if existing else {}
+    with get_session().get(video_url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+        if existing and r.status_code == 416:
+            return  # nothing past `existing`: the earlier download was complete
         r.raise_for_status()
-        with out_path.open("wb") as f:
+        # 206 continues the partial file; a plain 200 means the server ignored Range -> start over
+        with out_path.open("ab" if r.status_code == 206 else "wb") as f:
             for chunk in r.iter_content(chunk_size=1024 * 1024):
                 if chunk:
                     f.write(chunk)
 
 
+def download_path(video_url: str, filename: str) -> Path:
+    # deterministic per URL, so a retry on the same machine finds the partial download
+    digest = hashlib.blake2b(video_url.encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"yt_upload_{digest}" / filename
+
+
+def probe_content_length(video_url: str) -> Optional[int]:
+    """Size of the source video from a HEAD request, or None if the server doesn't say."""
+    try:
+        resp = get_session().head(
+            video_url,
+            headers={"Accept-Encoding": "identity"},
+            allow_redirects=True,
+            timeout=60,
+        )
+    except Exception:
+        return None
+    if resp.status_code in (404, 410):
+        # gone for good: fail before spending a download or an upload session on it
+        raise SourceUnavailable(f"Source video unavailable (HTTP {resp.status_code}): {video_url}")
+    if not resp.ok or resp.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    try:
+        size = int(resp.headers.get("Content-Length") or 0)
+    except ValueError:
+        return None
+    return size or None
+
+
+def _rechunk(pieces: Iterable[bytes], size: int) -> Iterator[bytes]:
+    # Regroup arbitrary download pieces into exact `size` chunks (last one may be short)
+    buf = bytearray()
+    for piece in pieces:
+        if not piece:
+            continue
+        if not buf and len(piece) == size:
+            yield piece
+            continue
+        buf += piece
+        while len(buf) >= size:
+            yield bytes(buf[:size])
+            del buf[:size]
+    if buf:
+        yield bytes(buf)
+
+
+def _prefetch(pieces: Iterable[bytes], depth: int) -> Iterator[bytes]:
+    """Pull `pieces` on a background thread, keeping up to `depth` ready ahead of the consumer.
+
+    Lets the download continue while the previous chunk is being uploaded; an
+    exception in the producer is re-raised in the consumer.
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+    holder: Dict[str, BaseException] = {}
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for piece in pieces:
+                if not put(piece):
+                    return
+        except BaseException as e:
+            holder["error"] = e
+        put(done)
+
+    t = threading.Thread(target=produce, name="upload-prefetch", daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            yield item
+        if "error" in holder:
+            raise holder["error"]
+    finally:
+        stop.set()  # consumer gave up early -> unblock and end the producer
+        t.join()
+
+
 def youtube_resumable_upload_init(
     access_token: str,
     *,
@@ -339,7 +641,8 @@ def youtube_resumable_upload_init(
     made_for_kids: bool,
 ) -> str:
     url = "https://www.googleapis.com/upload/youtube/v3/videos"
-    params = {"uploadType": "resumable", "part": "snippet,status"}
+    # fields=id trims the final upload response to the only value we read
+    params = {"uploadType": "resumable", "part": "snippet,status", "fields": "id"}
 
     payload: Dict[str, Any] = {
         "snippet": {
@@ -363,7 +666,7 @@ def youtube_resumable_upload_init(
         "X-Upload-Content-Length": str(file_size),
     }
 
-    resp = requests.post(url, params=params, headers=headers, json=payload, timeout=60)
+    resp = get_session().post(url, params=params, headers=headers, json=payload, timeout=60)
     resp.raise_for_status()
     upload_url = resp.headers.get("Location")
     if not upload_url:
@@ -371,13 +674,7 @@ def youtube_resumable_upload_init(
     return upload_url
 
 
-def youtube_resumable_upload_put(access_token: str, upload_url: str, file_path: Path, *, mime_type: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": mime_type,
-    }
-    with file_path.open("rb") as f:
-        resp = requests.put(upload_url, headers=headers, data=f, timeout=DOWNLOAD_TIMEOUT)
+def _uploaded_video_id(resp: Any) -> str:
     resp.raise_for_status()
     data = resp.json()
     vid = str(data.get("id") or "").strip()
@@ -386,82 +683,341 @@ def youtube_resumable_upload_put(access_token: str, upload_url: str, file_path:
     return vid
 
 
+def _file_chunks(path: Path, size: int) -> Iterator[memoryview]:
+    # one reused buffer: readinto() + memoryview slices, no per-chunk bytes allocation
+    # (each chunk is fully uploaded before the next read overwrites the buffer)
+    buf = bytearray(size)
+    view = memoryview(buf)
+    with path.open("rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                return
+            yield view[:n]
+
+
+def _stored_offset(resp: Any) -> int:
+    # 308 Resume Incomplete carries "Range: bytes=0-N" once the server has any bytes
+    stored = resp.headers.get("Range")
+    return int(stored.rsplit("-", 1)[1]) + 1 if stored else 0
+
+
+def _query_upload_status(access_token: str, upload_url: str, total: int) -> Any:
+    # Empty PUT with "bytes */TOTAL" asks the session how much it has stored
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Length": "0",
+        "Content-Range": f"bytes */{total}",
+    }
+    return get_session().put(upload_url, headers=headers, timeout=60)
+
+
+def youtube_resumable_upload_chunks(
+    access_token: str,
+    upload_url: str,
+    chunks: Iterable[Union[bytes, memoryview]],
+    *,
+    total: int,
+    mime_type: str,
+) -> str:
+    """PUT `chunks` (UPLOAD_CHUNK-sized, in order) to a resumable session with Content-Range.
+
+    The current chunk stays in memory, so a 5xx or dropped connection re-sends only
+    the part of it the server did not store (after exponential backoff). A 308 that
+    stores nothing new counts toward UPLOAD_RETRIES like a 5xx.
+    """
+    offset = 0
+    for chunk in chunks:
+        start = offset
+        end = start + len(chunk)
+        failures = 0
+        while offset < end:
+            part = chunk if offset == start else chunk[offset - start:]
+            headers = {
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": mime_type,
+                "Content-Length": str(end - offset),  # fixed-length body, never chunked encoding
+                "Content-Range": f"bytes {offset}-{end - 1}/{total}",
+            }
+            try:
+                resp = get_session().put(upload_url, headers=headers, data=part, timeout=DOWNLOAD_TIMEOUT)
+            except OSError as e:  # requests' ConnectionError/Timeout derive from OSError
+                resp, err = None, str(e)
+            else:
+                err = f"HTTP {resp.status_code}"
+
+            if resp is not None and resp.status_code < 500:
+                if resp.status_code != 308:
+                    return _uploaded_video_id(resp)
+                # 308 Resume Incomplete: continue from what the server actually stored
+                stored = _stored_offset(resp)
+                if stored > offset:
+                    failures = 0
+                else:
+                    # nothing stored: counts as a failure so a stuck session can't be re-sent forever
+                    failures += 1
+                    if failures > UPLOAD_RETRIES:
+                        raise RuntimeError(f"Upload stalled at offset {offset} after {UPLOAD_RETRIES} retries: {err}")
+                    time.sleep(min(UPLOAD_BACKOFF_SEC * 2 ** (failures - 1), UPLOAD_BACKOFF_MAX_SEC))
+                offset = stored
+            else:
+                failures += 1
+                if failures > UPLOAD_RETRIES:
+                    raise RuntimeError(f"Upload failed at offset {offset} after {UPLOAD_RETRIES} retries: {err}")
+                time.sleep(min(UPLOAD_BACKOFF_SEC * 2 ** (failures - 1), UPLOAD_BACKOFF_MAX_SEC))
+                try:
+                    status = _query_upload_status(access_token, upload_url, total)
+                except OSError:
+                    continue  # retry the same range
+                if status.status_code == 308:
+                    offset = _stored_offset(status)
+                elif status.status_code < 500:
+                    return _uploaded_video_id(status)
+
+            if offset < start:
+                raise RuntimeError(f"Upload session lost bytes before offset {start} (server has {offset})")
+
+    raise RuntimeError(f"Upload incomplete: source ended at {offset} of {total} bytes")
+
+
+def youtube_upload_video_http(
+    access_token: str,
+    upload_url: str,
+    *,
+    total: int,
+    mime_type: str,
+    file_path: Optional[Path] = None,
+    stream: Optional[Iterable[bytes]] = None,
+) -> str:
+    """Upload a local file or an in-order byte stream (exactly one of them) to the resumable session."""
+    if (file_path is None) == (stream is None):
+        raise ValueError("pass exactly one of file_path / stream")
+    if file_path is not None:
+        chunks = _file_chunks(file_path, UPLOAD_CHUNK)
+    else:
+        chunks = _rechunk(stream, UPLOAD_CHUNK)
+    return youtube_resumable_upload_chunks(access_token, upload_url, chunks, total=total, mime_type=mime_type)
+
+
+def stream_download_to_youtube(
+    access_token: str,
+    video_url: str,
+    upload_url: str,
+    *,
+    total: int,
+    mime_type: str,
+) -> str:
+    """Pipe the source video into the resumable session chunk by chunk (no temp file).
+
+    The download runs PREFETCH_CHUNKS ahead on a background thread, so it overlaps the upload.
+    """
+    return youtube_upload_video_http(
+        access_token,
+        upload_url,
+        total=total,
+        mime_type=mime_type,
+        stream=_prefetch(_source_pieces(video_url, UPLOAD_CHUNK), PREFETCH_CHUNKS),
+    )
+
+
+def _source_pieces(video_url: str, size: int) -> Iterator[bytes]:
+    # any failure on the download side (GET, 5xx, broken stream) surfaces as SourceDownloadFailed
+    try:
+        with get_session().get(
+            video_url,
+            headers={"Accept-Encoding": "identity"},
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT,
+        ) as r:
+            r.raise_for_status()
+            yield from r.iter_content(chunk_size=size)
+    except Exception as e:
+        raise SourceDownloadFailed(f"Source download failed: {e}") from e
+
+
 def record_attempt(state: Dict[str, Any], item: VideoItem, *, result: str, video_id: str = "", error: str = "") -> None:
     items = state.setdefault("items", {})
-    rec = items.get(item.video_url) if isinstance(items, dict) else None
+    key = item_key(item.video_url)
+    rec = items.get(key) if isinstance(items, dict) else None
     if not isinstance(rec, dict):
         rec = {"attempts": 0}
-        items[item.video_url] = rec
+        items[key] = rec
 
     rec["video_url"] = item.video_url
     rec["filename"] = item.filename
     rec["manifest"] = item.manifest_name
-    rec["title"] = item.title
-    rec["destination_url"] = item.destination_url
     rec["result"] = result
     rec["attempts"] = int(rec.get("attempts") or 0) + 1
     rec["video_id"] = video_id
     if error:
         rec["error"] = error
 
-    state.setdefault("runs", []).append(
+    ts_utc = datetime.now(timezone.utc).isoformat()
+    runs = state.setdefault("runs", [])
+    runs.append(
         {
-            "ts_utc": datetime.now(timezone.utc).isoformat(),
+            "ts_utc": ts_utc,
             "video_url": item.video_url,
             "result": result,
             "video_id": video_id,
         }
     )
 
+    # O(1) pointer to the newest upload (read by comment_worker before it walks runs)
+    if result == "success":
+        state["latest_success"] = {
+            "ts_utc": ts_utc,
+            "video_url": item.video_url,
+            "manifest": item.manifest_name,
+            "result": result,
+            "video_id": video_id,
+        }
 
-def main() -> None:
-    all_items = read_all_items()
-    if not all_items:
-        raise SystemExit(f"No manifest items found in {MANIFEST_DIR}")
 
-    state = load_or_init_state()
-    item = pick_next_item(state, all_items)
-    if not item:
-        print("No eligible video to post (all posted or exhausted attempts).")
-        return
+class UploadFailed(RuntimeError):
+    """The byte upload itself failed; counted as an attempt against the video."""
 
-    title = _truncate(item.title.strip(), TITLE_MAX)
-    description = build_description(item)
-    tags = build_tags(item)
 
-    access_token = get_access_token()
+class SourceDownloadFailed(RuntimeError):
+    """Reading the source video failed mid-stream; like other download errors, not an attempt."""
+
+
+class SourceUnavailable(RuntimeError):
+    """The source video is gone (HTTP 404/410); recorded so the picker moves past it."""
 
-    with tempfile.TemporaryDirectory() as td:
-        local_path = Path(td) / item.filename
+
+def upload_item(access_token: str, item: VideoItem, cfg: Config) -> str:
+    title = _truncate(item.title, TITLE_MAX)
+    description = build_description(item)
+    tags = build_tags(item, cfg.tags)
+
+    mime_type = "video/mp4"
+    file_size = probe_content_length(item.video_url)
+
+    local_path: Optional[Path] = None
+    if file_size:
+        print(f"Streaming: {item.video_url}")
+    else:
+        # Source size unknown: stage to disk so the upload length is known up front
+        local_path = download_path(item.video_url, item.filename)
+        local_path.parent.mkdir(parents=True, exist_ok=True)
         print(f"Downloading: {item.video_url}")
         download_video(item.video_url, local_path)
-
         file_size = local_path.stat().st_size
-        mime_type = "video/mp4"
-
-        print("Init upload...")
-        upload_url = youtube_resumable_upload_init(
-            access_token,
-            file_size=file_size,
-            mime_type=mime_type,
-            title=title,
-            description=description,
-            tags=tags,
-            privacy_status=DEFAULT_PRIVACY_STATUS,
-            category_id=DEFAULT_CATEGORY_ID,
-            made_for_kids=DEFAULT_MADE_FOR_KIDS,
+
+    print("Init upload...")
+    upload_url = youtube_resumable_upload_init(
+        access_token,
+        file_size=file_size,
+        mime_type=mime_type,
+        title=title,
+        description=description,
+        tags=tags,
+        privacy_status=cfg.privacy,
+        category_id=cfg.category_id,
+        made_for_kids=cfg.made_for_kids,
+    )
+
+    print("Uploading bytes...")
+    try:
+        if local_path is None:
+            return stream_download_to_youtube(
+                access_token, item.video_url, upload_url, total=file_size, mime_type=mime_type
+            )
+        video_id = youtube_upload_video_http(
+            access_token, upload_url, total=file_size, mime_type=mime_type, file_path=local_path
         )
+    except SourceDownloadFailed:
+        raise
+    except Exception as e:
+        raise UploadFailed(str(e)) from e
+    # keep the staged file only while a retry might still need it
+    shutil.rmtree(local_path.parent, ignore_errors=True)
+    return video_id
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Upload the next manifest video(s) to YouTube.")
+    ap.add_argument(
+        "--batch",
+        type=int,
+        default=MAX_VIDEOS_PER_RUN,
+        metavar="N",
+        help=f"videos to upload this run, {UPLOAD_WORKERS} at a time (default: {MAX_VIDEOS_PER_RUN})",
+    )
+    args = ap.parse_args(argv)
+    if args.batch < 1:
+        ap.error("--batch must be >= 1")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    cfg = Config.from_env()
+    if cfg.dry_run:
+        # nothing is uploaded, so nothing is written back (no StateWriter: runs aren't trimmed or archived)
+        run(load_or_init_state(), cfg, batch=args.batch)
+        return
+    # single write at the end of the run (skipped when nothing changed)
+    with StateWriter(STATE_PATH) as state:
+        run(state, cfg, batch=args.batch)
+
+
+def run(state: Dict[str, Any], cfg: Config, *, batch: int = MAX_VIDEOS_PER_RUN) -> None:
+    migrate_state(state)
+    # manifests already fully posted (unchanged content) are not parsed again
+    all_items = read_all_items(state.get("manifest_scan"))
+    if not all_items and not state.get("manifest_scan"):
+        raise SystemExit(f"No manifest items found in {MANIFEST_DIR}")
+
+    items = pick_next_items(state, all_items, batch)
+    if not items:
+        print("No eligible video to post (all posted or exhausted attempts).")
+        update_exhausted_manifests(state, all_items)
+        return
+
+    if cfg.dry_run:
+        for it in items:
+            print(f"DRY RUN: would upload {it.video_url} as {_truncate(it.title, TITLE_MAX)!r} ({cfg.privacy})")
+        return
 
-        print("Uploading bytes...")
+    access_token = get_access_token()
+
+    # Network-bound: several videos upload concurrently, one thread each
+    outcomes: List[Tuple[VideoItem, Optional[str], Optional[Exception]]] = []
+    if len(items) == 1:
         try:
-            video_id = youtube_resumable_upload_put(access_token, upload_url, local_path, mime_type=mime_type)
-            record_attempt(state, item, result="success", video_id=video_id)
-            save_json_atomic(STATE_PATH, state)
-            print(f"SUCCESS video_id={video_id}")
+            outcomes.append((items[0], upload_item(access_token, items[0], cfg), None))
         except Exception as e:
-            record_attempt(state, item, result="failed", error=str(e))
-            save_json_atomic(STATE_PATH, state)
-            raise
+            outcomes.append((items[0], None, e))
+    else:
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(items))) as pool:
+            futures = [(it, pool.submit(upload_item, access_token, it, cfg)) for it in items]
+            for it, fut in futures:
+                try:
+                    outcomes.append((it, fut.result(), None))
+                except Exception as e:
+                    outcomes.append((it, None, e))
+
+    errors: List[Exception] = []
+    for item, video_id, err in outcomes:
+        if err is None:
+            record_attempt(state, item, result="success", video_id=video_id or "")
+            print(f"SUCCESS video_id={video_id}")
+        elif isinstance(err, SourceUnavailable):
+            # not a run failure: the state must be committed so the next run picks another video
+            record_attempt(state, item, result="unavailable", error=str(err))
+            print(f"UNAVAILABLE: {err}")
+        elif isinstance(err, UploadFailed):
+            record_attempt(state, item, result="failed", error=str(err))
+            errors.append(err)
+        else:
+            # download/init problems (quota, network) don't count as attempts
+            errors.append(err)
+
+    update_exhausted_manifests(state, all_items)
+    if errors:
+        raise errors[0]
 
 
 if __name__ == "__main__":
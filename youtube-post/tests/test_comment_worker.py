@@ -0,0 +1,308 @@
+# ============================================
+# File: youtube-post/tests/test_comment_worker.py
+# Purpose: Unit tests for the YouTube comment worker helpers
+# ============================================
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import comment_worker  # noqa: E402
+
+
+def _part(idx, status_line, body):
+    return (
+        "--b\r\n"
+        "Content-Type: application/http\r\n"
+        f"Content-ID: <response-item{idx}>\r\n\r\n"
+        f"{status_line}\r\n"
+        "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+        f"{body}\r\n"
+    )
+
+
+class ParseBatchResponseTests(unittest.TestCase):
+    CT = "multipart/mixed; boundary=b"
+
+    def test_maps_each_part_to_its_content_id(self):
+        text = (
+            _part(1, "HTTP/1.1 200 OK", '{"id": "c1"}')
+            + _part(0, "HTTP/1.1 200 OK", '{"id": "c0"}')
+            + "--b--\r\n"
+        )
+
+        self.assertEqual(comment_worker.parse_batch_response(self.CT, text, 2), ["c0", "c1"])
+
+    def test_error_part_becomes_exception(self):
+        text = (
+            _part(0, "HTTP/1.1 200 OK", '{"id": "c0"}')
+            + _part(1, "HTTP/1.1 403 Forbidden", '{"error": {"code": 403}}')
+            + "--b--\r\n"
+        )
+
+        out = comment_worker.parse_batch_response(self.CT, text, 2)
+
+        self.assertEqual(out[0], "c0")
+        self.assertIsInstance(out[1], RuntimeError)
+        self.assertIn("403", str(out[1]))
+
+    def test_unreadable_part_body_does_not_fail_siblings(self):
+        text = (
+            _part(0, "HTTP/1.1 200 OK", "<html>oops</html>")
+            + _part(1, "HTTP/1.1 200 OK", '{"id": "c1"}')
+            + "--b--\r\n"
+        )
+
+        out = comment_worker.parse_batch_response(self.CT, text, 2)
+
+        self.assertIsInstance(out[0], RuntimeError)
+        self.assertEqual(out[1], "c1")
+
+    def test_missing_part_is_reported(self):
+        text = _part(0, "HTTP/1.1 200 OK", '{"id": "c0"}') + "--b--\r\n"
+
+        out = comment_worker.parse_batch_response(self.CT, text, 2)
+
+        self.assertEqual(out[0], "c0")
+        self.assertIsInstance(out[1], RuntimeError)
+
+    def test_non_multipart_response_raises(self):
+        with self.assertRaises(RuntimeError):
+            comment_worker.parse_batch_response("application/json", "{}", 1)
+
+
+class CommentStateLogTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_p = Path(tmp.name) / "state.json"
+        self.log_p = Path(tmp.name) / "log.ndjson"
+
+    def test_missing_files_give_empty_state(self):
+        cstate = comment_worker.load_comment_state(self.state_p, self.log_p)
+
+        self.assertEqual(cstate["items"], {})
+
+    def test_log_replays_over_snapshot_last_record_wins(self):
+        self.state_p.write_text(json.dumps({"version": 1, "items": {
+            "a": {"comment_status": "posted"},
+            "b": {"comment_status": "posted"},
+        }}))
+        self.log_p.write_text(
+            json.dumps({"video_id": "b", "rec": {"comment_status": "failed"}}) + "\n"
+            + json.dumps({"video_id": "c", "rec": {"comment_status": "posted"}}) + "\n"
+            + json.dumps({"video_id": "b", "rec": {"comment_status": "verified"}}) + "\n"
+        )
+
+        items = comment_worker.load_comment_state(self.state_p, self.log_p)["items"]
+
+        self.assertEqual(items["a"], {"comment_status": "posted"})
+        self.assertEqual(items["b"], {"comment_status": "verified"})
+        self.assertEqual(items["c"], {"comment_status": "posted"})
+
+    def test_torn_and_malformed_lines_are_skipped(self):
+        self.log_p.write_text(
+            json.dumps({"video_id": "a", "rec": {"comment_status": "posted"}}) + "\n"
+            + '["not", "a", "record"]\n'
+            + '{"video_id": "b", "rec": {"comm'
+        )
+
+        items = comment_worker.load_comment_state(self.state_p, self.log_p)["items"]
+
+        self.assertEqual(items, {"a": {"comment_status": "posted"}})
+
+    def test_save_appends_then_snapshot_truncates_log(self):
+        cstate = comment_worker.load_comment_state(self.state_p, self.log_p)
+        cstate["items"]["a"] = {"comment_status": "posted"}
+        comment_worker.save_comment_state(self.state_p, self.log_p, cstate, {"a": cstate["items"]["a"]})
+
+        self.assertFalse(self.state_p.exists())
+        self.assertEqual(
+            comment_worker.load_comment_state(self.state_p, self.log_p)["items"],
+            {"a": {"comment_status": "posted"}},
+        )
+
+        cstate["items"]["b"] = {"comment_status": "failed"}
+        comment_worker.save_comment_state(
+            self.state_p, self.log_p, cstate, {"b": cstate["items"]["b"]}, snapshot=True
+        )
+
+        self.assertEqual(self.log_p.read_bytes(), b"")
+        self.assertEqual(
+            comment_worker.load_comment_state(self.state_p, self.log_p)["items"],
+            {"a": {"comment_status": "posted"}, "b": {"comment_status": "failed"}},
+        )
+
+
+class IterEligibleTests(unittest.TestCase):
+    def test_pending_records_outside_the_runs_window_are_still_eligible(self):
+        post_state = {
+            "runs": [{"result": "success", "video_id": "recent"}],
+            "items": {"k": {"video_id": "old", "manifest": "wood.json"}},
+        }
+        cstate = {"items": {
+            "recent": {"comment_status": comment_worker.STATUS_COMMENTED},
+            "old": {"comment_status": comment_worker.STATUS_UNVERIFIED, "verify_after_ts": 0},
+            "done": {"comment_status": comment_worker.STATUS_COMMENTED},
+            "later": {"comment_status": comment_worker.STATUS_FAILED, "retry_after_ts": 2 ** 40},
+        }}
+
+        eligible = list(comment_worker.iter_eligible(post_state, cstate))
+
+        self.assertEqual(
+            [(run["youtube_video_id"], run.get("manifest")) for run, _ in eligible],
+            [("old", "wood.json")],
+        )
+        self.assertIs(eligible[0][1], cstate["items"]["old"])
+
+    def test_manifest_from_legacy_post_record_or_own_record(self):
+        post_state = {"items": {
+            "k1": {"youtube_video_id": "legacy", "manifest": "wood.json"},
+            "k2": {"video_id": "own", "manifest": "metal.json"},
+        }}
+        pending = {"comment_status": comment_worker.STATUS_FAILED, "retry_after_ts": 0}
+        cstate = {"items": {
+            "legacy": dict(pending),
+            "own": dict(pending, manifest="plastic.json"),
+        }}
+
+        eligible = {run["youtube_video_id"]: run["manifest"] for run, _ in comment_worker.iter_eligible(post_state, cstate)}
+
+        self.assertEqual(eligible, {"legacy": "wood.json", "own": "plastic.json"})
+
+    def test_runs_come_before_own_records(self):
+        post_state = {"runs": [{"result": "success", "video_id": "new"}]}
+        cstate = {"items": {"old": {"comment_status": comment_worker.STATUS_FAILED, "retry_after_ts": 0}}}
+
+        eligible = [run["youtube_video_id"] for run, _ in comment_worker.iter_eligible(post_state, cstate)]
+
+        self.assertEqual(eligible, ["new", "old"])
+
+
+class _CommentThreadsApi:
+    """commentThreads.list stand-in: 404s the whole call when any requested id is gone."""
+
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        ids = params["id"].split(",")
+        self.calls.append(ids)
+        resp = mock.Mock()
+        if not set(ids) <= self.existing:
+            resp.status_code = 404
+        else:
+            resp.status_code = 200
+            resp.json.return_value = {"items": [{"id": i} for i in ids]}
+        return resp
+
+
+class VerifyPathTests(unittest.TestCase):
+    VIDS = [f"v{i}" for i in range(5)]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        base = Path(tmp.name)
+        self.post_p = base / "post.json"
+        self.comm_p = base / "comment.json"
+        self.log_p = base / "comment.log.ndjson"
+        self.post_p.write_text(json.dumps({
+            "runs": [{"result": "success", "video_id": vid} for vid in self.VIDS],
+        }))
+        for name, value in (
+            ("POST_STATE_PATH", self.post_p),
+            ("COMMENT_STATE_PATH", self.comm_p),
+            ("COMMENT_RUNS_PATH", base / "comment.runs.ndjson"),
+            ("COMMENT_LOG_PATH", self.log_p),
+            ("get_access_token", lambda: "token"),
+        ):
+            patcher = mock.patch.object(comment_worker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, existing, verify_attempts):
+        self.comm_p.write_text(json.dumps({"version": 1, "items": {
+            vid: {
+                "comment_status": comment_worker.STATUS_UNVERIFIED,
+                "comment_id": f"c-{vid}",
+                "verify_after_ts": 0,
+                "verify_attempts": verify_attempts,
+            }
+            for vid in self.VIDS
+        }}))
+        api = _CommentThreadsApi(existing)
+        with mock.patch.object(comment_worker, "get_session", return_value=api):
+            self.assertEqual(comment_worker.main(), 0)
+        return comment_worker.load_comment_state(self.comm_p, self.log_p)["items"], api
+
+    def test_one_missing_comment_does_not_clear_the_rest_of_the_batch(self):
+        items, api = self._run({"c-v0", "c-v1", "c-v2", "c-v4"}, verify_attempts=2)
+
+        self.assertGreater(len(api.calls), 1)
+        for vid in ("v0", "v1", "v2", "v4"):
+            self.assertEqual(items[vid]["comment_status"], comment_worker.STATUS_COMMENTED)
+            self.assertEqual(items[vid]["comment_id"], f"c-{vid}")
+        # only the comment that is really gone is cleared for a repost
+        self.assertNotIn("comment_status", items["v3"])
+        self.assertNotIn("comment_id", items["v3"])
+
+    def test_batch_404_clears_no_record_before_the_last_attempt(self):
+        items, _ = self._run({"c-v0", "c-v1", "c-v2", "c-v4"}, verify_attempts=0)
+
+        for vid in self.VIDS:
+            self.assertIn(
+                items[vid]["comment_status"],
+                (comment_worker.STATUS_COMMENTED, comment_worker.STATUS_UNVERIFIED),
+            )
+            self.assertEqual(items[vid]["comment_id"], f"c-{vid}")
+        self.assertEqual(items["v3"]["verify_attempts"], 1)
+
+
+class CommentPlanTests(unittest.TestCase):
+    def test_malformed_stored_plan_is_replanned(self):
+        post_state = {"runs": [{"result": "success", "video_id": vid} for vid in ("a", "b", "c")]}
+        cstate = {"items": {
+            "a": {"comment_plan": {"template_idx": None}},
+            "b": {"comment_plan": {"template_idx": "2"}},
+            "c": {"comment_plan": {"template_idx": 10 ** 6}},
+        }}
+        posted = []
+
+        def post_comments(token, pairs):
+            posted.extend(pairs)
+            return [f"cid-{vid}" for vid, _ in pairs]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "post.json").write_text(json.dumps(post_state))
+            (base / "comment.json").write_text(json.dumps(cstate))
+            with mock.patch.multiple(
+                comment_worker,
+                POST_STATE_PATH=base / "post.json",
+                COMMENT_STATE_PATH=base / "comment.json",
+                COMMENT_RUNS_PATH=base / "comment.runs.ndjson",
+                COMMENT_LOG_PATH=base / "comment.log.ndjson",
+                MAX_COMMENTS_PER_RUN=3,
+                get_access_token=lambda: "token",
+                post_comments=post_comments,
+            ):
+                self.assertEqual(comment_worker.main(), 0)
+                items = comment_worker.load_comment_state(base / "comment.json", base / "comment.log.ndjson")["items"]
+
+        self.assertEqual(sorted(vid for vid, _ in posted), ["a", "b", "c"])
+        for vid in ("a", "b", "c"):
+            idx = items[vid]["comment_plan"]["template_idx"]
+            self.assertIsInstance(idx, int)
+            self.assertTrue(0 <= idx < len(comment_worker.TEMPLATES))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,320 @@
+# ============================================
+# File: youtube-post/tests/test_post_one_video.py
+# Purpose: Unit tests for the YouTube post worker (resumable upload, state, picking)
+# ============================================
+
+import gzip
+import http.server
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import post_one_video  # noqa: E402
+
+CONTENT_RANGE_RE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+)")
+
+
+class _UploadSession(http.server.BaseHTTPRequestHandler):
+    """Minimal YouTube resumable session: stores PUT ranges, answers 308 / 200 like the real one."""
+
+    def do_PUT(self):
+        srv = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        content_range = self.headers.get("Content-Range", "")
+        srv.ranges.append(content_range)
+        m = CONTENT_RANGE_RE.fullmatch(content_range)
+        if not m:
+            return self._reply(400)
+        total = int(m[3])
+
+        action = srv.actions.pop(0) if m[1] is not None and srv.actions else "store"
+        if action == "error":
+            return self._reply(503)
+        if m[1] is not None and action != "stall" and int(m[1]) == len(srv.stored):
+            keep = len(body) // 2 if action == "half" else len(body)
+            srv.stored += body[:keep]
+
+        if len(srv.stored) == total:
+            return self._reply(200, json.dumps({"id": "VID123"}).encode())
+        headers = {"Range": f"bytes=0-{len(srv.stored) - 1}"} if srv.stored else {}
+        return self._reply(308, headers=headers)
+
+    def _reply(self, code, body=b"", headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ResumableUploadTests(unittest.TestCase):
+    DATA = bytes(range(256)) * 40  # 10240 bytes
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _UploadSession)
+        self.server.stored = bytearray()
+        self.server.ranges = []
+        self.server.actions = []
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/upload?upload_id=x"
+
+        for name, value in (("UPLOAD_BACKOFF_SEC", 0.0), ("UPLOAD_RETRIES", 3)):
+            patcher = mock.patch.object(post_one_video, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _upload(self, chunk_size=4096):
+        chunks = [self.DATA[i:i + chunk_size] for i in range(0, len(self.DATA), chunk_size)]
+        return post_one_video.youtube_resumable_upload_chunks(
+            "token", self.url, chunks, total=len(self.DATA), mime_type="video/mp4"
+        )
+
+    def test_sends_each_chunk_with_content_range(self):
+        self.assertEqual(self._upload(), "VID123")
+
+        self.assertEqual(bytes(self.server.stored), self.DATA)
+        self.assertEqual(
+            self.server.ranges,
+            ["bytes 0-4095/10240", "bytes 4096-8191/10240", "bytes 8192-10239/10240"],
+        )
+
+    def test_partial_308_resends_only_the_missing_tail(self):
+        self.server.actions = ["half"]
+
+        self.assertEqual(self._upload(), "VID123")
+
+        self.assertEqual(bytes(self.server.stored), self.DATA)
+        self.assertEqual(self.server.ranges[:3], ["bytes 0-4095/10240", "bytes 2048-4095/10240", "bytes 4096-8191/10240"])
+
+    def test_5xx_queries_status_and_resumes(self):
+        self.server.actions = ["store", "error"]
+
+        self.assertEqual(self._upload(), "VID123")
+
+        self.assertEqual(bytes(self.server.stored), self.DATA)
+        self.assertEqual(
+            self.server.ranges,
+            [
+                "bytes 0-4095/10240",
+                "bytes 4096-8191/10240",
+                "bytes */10240",
+                "bytes 4096-8191/10240",
+                "bytes 8192-10239/10240",
+            ],
+        )
+
+    def test_308_without_progress_gives_up_after_retries(self):
+        self.server.actions = ["stall"] * 10
+
+        with self.assertRaisesRegex(RuntimeError, "stalled at offset 0"):
+            self._upload()
+
+        self.assertEqual(len(self.server.ranges), post_one_video.UPLOAD_RETRIES + 1)
+
+    def test_repeated_5xx_gives_up_after_retries(self):
+        self.server.actions = ["error"] * 10
+
+        with self.assertRaisesRegex(RuntimeError, "after 3 retries"):
+            self._upload()
+
+
+class MigrateStateTests(unittest.TestCase):
+    URL = "https://github.com/VladChat/video/releases/download/wood/a.mp4"
+
+    def test_rekeys_url_keyed_items_and_drops_manifest_copies(self):
+        state = {
+            "items": {
+                self.URL: {
+                    "result": "success",
+                    "attempts": 1,
+                    "video_id": "VID1",
+                    "title": "t",
+                    "description": "d",
+                    "destination_url": "https://equalle.com/",
+                },
+            },
+            "runs": [],
+        }
+
+        post_one_video.migrate_state(state)
+
+        key = post_one_video.item_key(self.URL)
+        self.assertEqual(list(state["items"]), [key])
+        self.assertEqual(
+            state["items"][key],
+            {"result": "success", "attempts": 1, "video_id": "VID1", "video_url": self.URL},
+        )
+
+    def test_already_migrated_state_is_left_alone(self):
+        key = post_one_video.item_key(self.URL)
+        state = {"items": {key: {"video_url": self.URL, "result": "failed", "attempts": 2}}}
+        before = json.loads(json.dumps(state))
+
+        post_one_video.migrate_state(state)
+
+        self.assertEqual(state, before)
+
+    def test_skipped_urls_sees_migrated_items(self):
+        state = {"items": {self.URL: {"result": "success", "attempts": 1}}}
+
+        post_one_video.migrate_state(state)
+
+        self.assertEqual(post_one_video.skipped_urls(state), {self.URL})
+
+
+class StateWriterTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_p = Path(tmp.name) / "state.json"
+        self.archive_p = Path(tmp.name) / "runs.jsonl.gz"
+        for name, value in (("RUNS_ARCHIVE_PATH", self.archive_p), ("MAX_RUNS_KEPT", 2)):
+            patcher = mock.patch.object(post_one_video, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _archived(self):
+        return [json.loads(line) for line in gzip.decompress(self.archive_p.read_bytes()).splitlines()]
+
+    def test_trims_runs_and_archives_evicted_after_write(self):
+        with post_one_video.StateWriter(self.state_p) as state:
+            state["runs"] = [{"n": i} for i in range(3)]
+        with post_one_video.StateWriter(self.state_p) as state:
+            state["runs"].append({"n": 3})
+
+        self.assertEqual(json.loads(self.state_p.read_bytes())["runs"], [{"n": 2}, {"n": 3}])
+        self.assertEqual(self._archived(), [{"n": 0}, {"n": 1}])
+
+    def test_failed_write_archives_nothing(self):
+        with mock.patch.object(post_one_video, "write_bytes_atomic", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                with post_one_video.StateWriter(self.state_p) as state:
+                    state["runs"] = [{"n": i} for i in range(3)]
+
+        self.assertFalse(self.archive_p.exists())
+
+    def test_dry_run_writes_and_archives_nothing(self):
+        self.state_p.write_text(json.dumps({"runs": [{"n": i} for i in range(3)]}))
+        before = self.state_p.read_bytes()
+
+        with mock.patch.object(post_one_video, "STATE_PATH", self.state_p), \
+                mock.patch.object(post_one_video, "read_all_items", return_value=[_item("a")]), \
+                mock.patch.dict(os.environ, {"YOUTUBE_POST_DRY_RUN": "1"}):
+            post_one_video.main([])
+
+        self.assertEqual(self.state_p.read_bytes(), before)
+        self.assertFalse(self.archive_p.exists())
+
+
+def _item(name):
+    return post_one_video.VideoItem(
+        manifest_name="wood.json",
+        manifest_action="",
+        manifest_tag="",
+        video_url=f"https://github.com/VladChat/video/releases/download/wood/{name}.mp4",
+        filename=f"{name}.mp4",
+        title=name,
+        description="",
+        destination_url="",
+        alt="",
+        status="ready",
+    )
+
+
+class SourceUnavailableTests(unittest.TestCase):
+    def test_gone_source_is_recorded_and_skipped_next_run(self):
+        gone, ready = _item("gone"), _item("ready")
+        session = mock.Mock()
+        session.head.return_value = mock.Mock(status_code=404, ok=False, headers={})
+        state = {}
+
+        with mock.patch.object(post_one_video, "read_all_items", return_value=[gone, ready]), \
+                mock.patch.object(post_one_video, "update_exhausted_manifests"), \
+                mock.patch.object(post_one_video, "get_access_token", return_value="token"), \
+                mock.patch.object(post_one_video, "get_session", return_value=session):
+            post_one_video.run(state, post_one_video.Config(), batch=1)
+
+        rec = state["items"][post_one_video.item_key(gone.video_url)]
+        self.assertEqual(rec["result"], "unavailable")
+        self.assertEqual(post_one_video.pick_next_items(state, [gone, ready], 1), [ready])
+
+
+class SourceStreamFailureTests(unittest.TestCase):
+    CHUNK = 1024
+    TOTAL = 4 * CHUNK
+
+    def _session(self, source_pieces):
+        session = mock.Mock()
+        session.head.return_value = mock.Mock(
+            status_code=200, ok=True, headers={"Content-Length": str(self.TOTAL)}
+        )
+        session.post.return_value = mock.Mock(status_code=200, headers={"Location": "https://upload.test/s"})
+
+        source = mock.MagicMock(status_code=200)
+        source.__enter__.return_value = source
+        source.iter_content.side_effect = lambda chunk_size: source_pieces()
+        session.get.return_value = source
+
+        stored = []
+
+        def put(url, headers=None, data=None, **kwargs):
+            stored.append(len(data))
+            return mock.Mock(status_code=308, headers={"Range": f"bytes=0-{sum(stored) - 1}"})
+
+        session.put.side_effect = put
+        return session, stored
+
+    def _run(self, session, item):
+        state = {}
+        with mock.patch.object(post_one_video, "read_all_items", return_value=[item]), \
+                mock.patch.object(post_one_video, "update_exhausted_manifests"), \
+                mock.patch.object(post_one_video, "get_access_token", return_value="token"), \
+                mock.patch.object(post_one_video, "get_session", return_value=session), \
+                mock.patch.object(post_one_video, "UPLOAD_CHUNK", self.CHUNK):
+            with self.assertRaises(post_one_video.SourceDownloadFailed):
+                post_one_video.run(state, post_one_video.Config(), batch=1)
+        return state
+
+    def test_source_stream_dying_mid_transfer_is_not_an_attempt(self):
+        def pieces():
+            yield b"x" * self.CHUNK
+            yield b"x" * self.CHUNK
+            raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+        session, stored = self._session(pieces)
+
+        state = self._run(session, _item("flaky"))
+
+        self.assertTrue(stored)  # the failure happened after upload PUTs had started
+        self.assertNotIn(post_one_video.item_key(_item("flaky").video_url), state.get("items") or {})
+
+    def test_source_5xx_is_not_an_attempt(self):
+        session, stored = self._session(lambda: iter(()))
+        session.get.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("503 Server Error")
+
+        state = self._run(session, _item("flaky"))
+
+        self.assertEqual(stored, [])
+        self.assertNotIn(post_one_video.item_key(_item("flaky").video_url), state.get("items") or {})
+
+
+if __name__ == "__main__":
+    unittest.main()
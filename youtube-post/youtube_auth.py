@@ -4,16 +4,71 @@
 # Notes:
 # - Uploading videos and posting comments require OAuth 2.0 user credentials.
 # - API keys (YOUTUBE_API_KEY) do NOT have permission to upload/comment.
+# - Access tokens are cached in-process until shortly before they expire, so
+#   several uploads/comments in one run share a single token exchange.
+# - The token is also cached on disk (0600, temp dir or YOUTUBE_TOKEN_CACHE_PATH)
+#   so back-to-back runs on the same machine skip the refresh round trip.
+#   Never point the cache under state/: that directory is committed to the repo.
 # ============================================
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-from typing import Dict
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-import requests
+from youtube_http import get_session
 
 DEFAULT_TOKEN_URI = "https://oauth2.googleapis.com/token"
+DEFAULT_EXPIRES_IN = 3600  # Google's access token lifetime when the response omits it
+EXPIRY_MARGIN_SEC = 60  # refresh this long before the token actually expires
+
+# (token_uri, client_id, refresh_token) -> (access_token, expires_at)
+_TOKEN_CACHE: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+
+
+def _cache_key(key: Tuple[str, str, str]) -> str:
+    # credentials change -> different key -> stale token is never reused
+    return hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()[:32]
+
+
+def _cache_path(digest: str) -> Path:
+    env = (os.getenv("YOUTUBE_TOKEN_CACHE_PATH") or "").strip()
+    if env:
+        return Path(env)
+    return Path(tempfile.gettempdir()) / f"youtube_oauth_token_{digest[:16]}.json"
+
+
+def _read_disk_token(digest: str) -> Optional[Tuple[str, float]]:
+    try:
+        data = json.loads(_cache_path(digest).read_text(encoding="utf-8"))
+        if data.get("key") != digest:
+            return None
+        return str(data["access_token"]), float(data["expires_at"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _write_disk_token(digest: str, token: str, expires_at: float) -> None:
+    # best effort: mkstemp creates a unique 0600 file next to the cache, then atomic rename
+    path = _cache_path(digest)
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"key": digest, "access_token": token, "expires_at": expires_at}, f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
 
 
 def get_access_token() -> str:
@@ -30,6 +85,17 @@ def get_access_token() -> str:
             "Note: YOUTUBE_API_KEY alone cannot upload/comment."
         )
 
+    key = (token_uri, client_id, refresh_token)
+    cached = _TOKEN_CACHE.get(key)
+    if cached and time.time() < cached[1] - EXPIRY_MARGIN_SEC:
+        return cached[0]
+
+    digest = _cache_key(key)
+    cached = _read_disk_token(digest)
+    if cached and time.time() < cached[1] - EXPIRY_MARGIN_SEC:
+        _TOKEN_CACHE[key] = cached
+        return cached[0]
+
     data: Dict[str, str] = {
         "client_id": client_id,
         "client_secret": client_secret,
@@ -37,10 +103,14 @@ def get_access_token() -> str:
         "grant_type": "refresh_token",
     }
 
-    resp = requests.post(token_uri, data=data, timeout=60)
+    resp = get_session().post(token_uri, data=data, timeout=60)
     resp.raise_for_status()
     payload = resp.json()
     token = (payload.get("access_token") or "").strip()
     if not token:
         raise RuntimeError(f"OAuth token response missing access_token: {payload}")
+    expires_in = float(payload.get("expires_in") or DEFAULT_EXPIRES_IN)
+    expires_at = time.time() + expires_in
+    _TOKEN_CACHE[key] = (token, expires_at)
+    _write_disk_token(digest, token, expires_at)
     return token
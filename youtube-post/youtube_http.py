@@ -0,0 +1,73 @@
+# ============================================
+# File: youtube-post/youtube_http.py
+# Purpose: Shared keep-alive HTTP session for the YouTube scripts
+# Notes:
+# - One pooled requests.Session per process, so download, upload init/PUT and
+#   comment calls reuse TCP+TLS connections instead of reconnecting each time.
+# - requests is imported on first use; runs that exit early never load it.
+# - User-Agent carries "gzip" so Google APIs compress their JSON responses.
+# - Sockets get TCP_NODELAY (no Nagle stall on the small JSON POSTs) and
+#   SO_KEEPALIVE (idle pooled connections are probed instead of silently dropped).
+# - Transient 5xx / connection errors are retried for GET and HEAD only; POSTs
+#   (comments, upload init) are not idempotent and upload PUTs resume themselves.
+# ============================================
+
+from __future__ import annotations
+
+import socket
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+POOL_CONNECTIONS = 4  # distinct hosts kept (googleapis.com, upload host, video CDN, ...)
+POOL_MAXSIZE = 8  # connections kept per host
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1.5
+RETRY_STATUS = (500, 502, 503, 504)
+RETRY_METHODS = frozenset(["GET", "HEAD"])
+
+SOCKET_OPTIONS: List[Tuple[int, int, int]] = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+_SESSION: Optional["requests.Session"] = None
+
+
+def _make_adapter() -> Any:
+    """Build an HTTPAdapter whose pool opens sockets with SOCKET_OPTIONS."""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class _SocketOptionsAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args: Any, **pool_kwargs: Any) -> None:
+            pool_kwargs.setdefault("socket_options", SOCKET_OPTIONS)
+            super().init_poolmanager(*args, **pool_kwargs)
+
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,  # hand the last response back; callers raise_for_status()
+    )
+    return _SocketOptionsAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+
+def get_session() -> "requests.Session":
+    """Return the process-wide pooled session (created on first use)."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+
+        session = requests.Session()
+        # Google only serves gzip responses to clients whose User-Agent contains "gzip";
+        # requests already sends Accept-Encoding: gzip and decompresses transparently.
+        session.headers["User-Agent"] = f"post.equalle.com (gzip) {requests.utils.default_user_agent()}"
+        adapter = _make_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _SESSION = session
+    return _SESSION